@@ -1,29 +1,127 @@
 import pandas as pd
 import numpy as np
-import networkx as nx
+import igraph as ig
+from numba import njit
+from scipy.sparse.csgraph import minimum_spanning_tree
 from typing import Dict, List, Tuple
+import itertools
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Get the absolute path to the data files
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORICAL_FILE = os.path.join(BASE_DIR, 'SNP 500 Price Data 2011-2020.csv')
+VALIDATION_FILE = os.path.join(BASE_DIR, 'SNP 500 Price Data 2021.csv')
+
+@njit(cache=True)
+def _subtree_pair_counts(order: np.ndarray, parents: np.ndarray, component_size: np.ndarray) -> np.ndarray:
+    """Count the node pairs whose tree path passes through each node, given a BFS order."""
+    n = order.shape[0]
+    subtree = np.ones(n)
+    child_squares = np.zeros(n)
+    for k in range(n - 1, -1, -1):
+        v = order[k]
+        p = parents[v]
+        if p >= 0 and p != v:
+            subtree[p] += subtree[v]
+            child_squares[p] += subtree[v] ** 2
+    pairs = np.empty(n)
+    for v in range(n):
+        rest = component_size[v] - subtree[v]
+        pairs[v] = ((component_size[v] - 1) ** 2 - child_squares[v] - rest ** 2) / 2
+    return pairs
+
+def _tree_betweenness(tree: ig.Graph) -> np.ndarray:
+    """Exact (unnormalized) betweenness of a tree or forest in O(n).
+    
+    Removing a node splits its component into the child subtrees and the rest,
+    and every pair split apart has its unique path through that node.
+    """
+    n = tree.vcount()
+    order = []
+    parents = np.full(n, -1, dtype=np.int64)
+    component_size = np.empty(n)
+    for component in tree.connected_components():
+        vids, _, bfs_parents = tree.bfs(component[0])
+        order.extend(vids)
+        parents[vids] = np.asarray(bfs_parents)[vids]
+        component_size[component] = len(component)
+    return _subtree_pair_counts(np.asarray(order, dtype=np.int64), parents, component_size)
+
+def _eigenvector_centrality(adjacency, max_iter: int = 5000, tol: float = 1e-9) -> np.ndarray:
+    """Leading eigenvector of a sparse adjacency by power iteration, unit L2 norm.
+    
+    Iterates on A + I: trees are bipartite, so A alone has eigenvalues +/-lambda
+    and the plain iteration oscillates instead of converging. The shift also
+    narrows the spectral gap; the 2011-2020 MSTs take up to ~1600 iterations.
+    """
+    n = adjacency.shape[0]
+    v = np.full(n, 1.0 / np.sqrt(n))
+    for _ in range(max_iter):
+        v_next = adjacency @ v + v
+        v_next /= np.linalg.norm(v_next)
+        if np.abs(v_next - v).sum() < n * tol:
+            return v_next
+        v = v_next
+    logger.warning(f"Eigenvector centrality did not converge in {max_iter} iterations")
+    return v
+
+def _analyze_year(log_returns: np.ndarray, tickers: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Flag the stocks meeting the central and peripheral criteria for one year of log returns.
+    
+    Both flag arrays follow tickers order.
+    """
+    correlation_matrix = pd.DataFrame(np.corrcoef(log_returns, rowvar=False), index=tickers, columns=tickers)
+    filtered_network = StockAnalyzer.create_filtered_network(correlation_matrix)
+    centrality_measures = StockAnalyzer.compute_centrality_measures(filtered_network, measures=('degree', 'betweenness'))
+    
+    degree_values = np.fromiter(centrality_measures['degree'].values(), dtype=np.float64)
+    betweenness_values = np.fromiter(centrality_measures['betweenness'].values(), dtype=np.float64)
+    degree_threshold = np.percentile(degree_values, 90)
+    betweenness_threshold = np.percentile(betweenness_values, 90)
+    
+    # Central criteria: in top 10% of either degree or betweenness
+    central = (degree_values >= degree_threshold) | (betweenness_values >= betweenness_threshold)
+    
+    # Peripheral criteria: degree equals 1 or betweenness equals 0
+    peripheral = (degree_values == degree_values.min()) | (betweenness_values == 0)
+    return central, peripheral
+
 class StockAnalyzer:
     def __init__(self):
         try:
-            # Get the absolute path to the data files
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            historical_file = os.path.join(base_dir, 'SNP 500 Price Data 2011-2020.csv')
-            validation_file = os.path.join(base_dir, 'SNP 500 Price Data 2021.csv')
+            historical_file = HISTORICAL_FILE
+            validation_file = VALIDATION_FILE
             
             # Load historical training data (2011-2020)
             logger.info(f"Loading historical data from {historical_file}")
             self.historical_data = pd.read_csv(historical_file, index_col=[0])
-            self.historical_data_cleaned = self.historical_data.dropna(axis=1)
+            self.historical_data_cleaned = self.historical_data.dropna(axis=1).astype(np.float32)
+            self.historical_data_cleaned.index = pd.to_datetime(self.historical_data_cleaned.index)
+            if not self.historical_data_cleaned.index.is_monotonic_increasing:
+                self.historical_data_cleaned = self.historical_data_cleaned.sort_index()
+            
+            # Integer row bounds per year so yearly slices are a plain iloc
+            index = self.historical_data_cleaned.index
+            self._year_bounds: Dict[int, Tuple[int, int]] = {
+                year: (index.searchsorted(pd.Timestamp(f'{year}-01-01')), index.searchsorted(pd.Timestamp(f'{year + 1}-01-01')))
+                for year in range(2011, 2021)
+            }
+            
+            # Log returns for the whole period, computed once; row k is the return into row k + 1
+            # float32 halves the memory traffic of the return scan; correlations are still taken in float64
+            prices = self.historical_data_cleaned.to_numpy()
+            self._log_returns = np.log(prices[1:] / prices[:-1])
+            
+            # Per-year (central, peripheral) flags from _analyze_year, kept per instance
+            self._year_flags: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
             
             # Load validation data (2021)
             logger.info(f"Loading validation data from {validation_file}")
             self.validation_data = pd.read_csv(validation_file, index_col=[0])
-            self.validation_data_cleaned = self.validation_data.dropna(axis=1)
+            self.validation_data_cleaned = self.validation_data.dropna(axis=1).astype(np.float32)
             
             logger.info("Data loaded successfully")
             logger.info(f"Historical data shape: {self.historical_data_cleaned.shape}")
@@ -38,128 +136,128 @@ class StockAnalyzer:
         
     def get_year_wise_data(self, year: int) -> pd.DataFrame:
         """Get data for a specific year."""
-        start_date = f'{year}-01-01'
-        end_date = f'{year}-12-31'
-        return self.historical_data_cleaned.loc[start_date:end_date]
+        # Other years fall back to searchsorted; like the old label slice, years without data give an empty frame
+        index = self.historical_data_cleaned.index
+        lo, hi = self._year_bounds.get(year) or (
+            index.searchsorted(pd.Timestamp(f'{year}-01-01')), index.searchsorted(pd.Timestamp(f'{year + 1}-01-01'))
+        )
+        return self.historical_data_cleaned.iloc[lo:hi]
         
     def compute_log_returns(self, data: pd.DataFrame) -> pd.DataFrame:
-        """Compute log returns for the dataset."""
-        return np.log(data.shift(1)) - np.log(data)
+        """Compute log returns for the dataset.
+        
+        Returns log(p_t / p_{t-1}); the first row is NaN. Correlations are
+        unaffected by the sign, so the downstream MST is the same as with the
+        previous (negated) convention.
+        """
+        # Private float32 copy so the log can be taken in place without touching data
+        log_prices = data.to_numpy(dtype=np.float32, copy=True)
+        np.log(log_prices, out=log_prices)
+        log_returns = np.empty_like(log_prices)
+        log_returns[0] = np.nan
+        np.subtract(log_prices[1:], log_prices[:-1], out=log_returns[1:])
+        return pd.DataFrame(log_returns, index=data.index, columns=data.columns)
         
     def compute_correlation_matrix(self, log_returns: pd.DataFrame) -> pd.DataFrame:
         """Compute correlation matrix from log returns."""
-        return log_returns.corr()
+        # Only the leading shift row is NaN, so drop it and correlate in NumPy
+        correlation = np.corrcoef(log_returns.to_numpy()[1:], rowvar=False)
+        return pd.DataFrame(correlation, index=log_returns.columns, columns=log_returns.columns)
         
-    def create_filtered_network(self, correlation_matrix: pd.DataFrame) -> nx.Graph:
+    @staticmethod
+    def create_filtered_network(correlation_matrix: pd.DataFrame) -> ig.Graph:
         """Create and filter network using MST."""
-        distance_matrix = np.sqrt(2 * (1 - correlation_matrix))
-        distance_graph = nx.Graph(distance_matrix)
-        return nx.minimum_spanning_tree(distance_graph)
+        tickers = list(correlation_matrix.columns)
+        distance_matrix = np.sqrt(2.0 * (1.0 - correlation_matrix.to_numpy()))
+        # np.corrcoef is only symmetric up to rounding, so keep the upper triangle
+        mst = minimum_spanning_tree(np.triu(distance_matrix, k=1)).tocoo()
+        return ig.Graph(
+            n=len(tickers),
+            edges=list(zip(mst.row.tolist(), mst.col.tolist())),
+            edge_attrs={'weight': mst.data.tolist()},
+            vertex_attrs={'name': tickers}
+        )
         
-    def compute_centrality_measures(self, graph: nx.Graph) -> Dict[str, Dict[str, float]]:
-        """Compute various centrality measures for the network."""
-        return {
-            'degree': nx.degree_centrality(graph),
-            'betweenness': nx.betweenness_centrality(graph),
-            'closeness': nx.closeness_centrality(graph),
-            'eigenvector': nx.eigenvector_centrality_numpy(graph)
-        }
+    @staticmethod
+    def compute_centrality_measures(graph: ig.Graph, measures: Tuple[str, ...] = ('degree', 'betweenness')) -> Dict[str, Dict[str, float]]:
+        """Compute the requested centrality measures for the network.
         
-    def compute_distance_criteria(self, graph: nx.Graph, correlation_matrix: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+        Only degree and betweenness feed the portfolio selection, so closeness
+        and eigenvector are computed only when asked for.
+        """
+        tickers = graph.vs['name']
+        n = graph.vcount()
+        centrality = {}
+        if 'degree' in measures:
+            # As in networkx, a single node has degree centrality 1
+            centrality['degree'] = dict(zip(tickers, [d / (n - 1) if n > 1 else 1.0 for d in graph.degree()]))
+        if 'betweenness' in measures:
+            # The MST is a tree, so betweenness is exact from subtree sizes rather than Brandes;
+            # like networkx, leave it unscaled for n <= 2 where every value is 0
+            betweenness = _tree_betweenness(graph)
+            if n > 2:
+                betweenness = betweenness / ((n - 1) * (n - 2) / 2)
+            betweenness = betweenness.tolist()
+            centrality['betweenness'] = dict(zip(tickers, betweenness))
+        if 'closeness' in measures:
+            centrality['closeness'] = dict(zip(tickers, graph.closeness()))
+        if 'eigenvector' in measures:
+            centrality['eigenvector'] = dict(zip(tickers, _eigenvector_centrality(graph.get_adjacency_sparse()).tolist()))
+        return centrality
+        
+    def compute_distance_criteria(self, graph: ig.Graph, correlation_matrix: pd.DataFrame) -> Dict[str, Dict[str, float]]:
         """Compute the three distance criteria from the paper."""
+        tickers = graph.vs['name']
+        n = graph.vcount()
+        # All-pairs hop counts on the MST, one BFS per node in C
+        path_lengths = np.asarray(graph.distances())
+        
         # 1. Distance on degree criterion
-        degree_centrality = nx.degree_centrality(graph)
-        node_with_largest_degree = max(degree_centrality, key=degree_centrality.get)
-        distance_degree = {node: nx.shortest_path_length(graph, node, node_with_largest_degree) 
-                         for node in graph.nodes()}
+        node_with_largest_degree = int(np.argmax(graph.degree()))
+        distance_degree = path_lengths[:, node_with_largest_degree]
         
         # 2. Distance on correlation criterion
-        sum_correlation = {}
-        for node in graph.nodes():
-            neighbors = list(graph.neighbors(node))
-            sum_correlation[node] = sum(correlation_matrix[node][neighbor] for neighbor in neighbors)
-        node_with_highest_correlation = max(sum_correlation, key=sum_correlation.get)
-        distance_correlation = {node: nx.shortest_path_length(graph, node, node_with_highest_correlation) 
-                              for node in graph.nodes()}
+        # Row sums of the elementwise product of the sparse MST adjacency and the correlations
+        adjacency = graph.get_adjacency_sparse()
+        sum_correlation = np.asarray(adjacency.multiply(correlation_matrix.loc[tickers, tickers].to_numpy()).sum(axis=1)).ravel()
+        node_with_highest_correlation = int(np.argmax(sum_correlation))
+        distance_correlation = path_lengths[:, node_with_highest_correlation]
         
         # 3. Distance on distance criterion
-        mean_distances = {}
-        for node in graph.nodes():
-            other_nodes = list(graph.nodes())
-            other_nodes.remove(node)
-            distances = [nx.shortest_path_length(graph, node, other) for other in other_nodes]
-            mean_distances[node] = np.mean(distances)
-        node_with_minimum_mean_distance = min(mean_distances, key=mean_distances.get)
-        distance_distance = {node: nx.shortest_path_length(graph, node, node_with_minimum_mean_distance) 
-                           for node in graph.nodes()}
+        mean_distances = path_lengths.sum(axis=1) / (n - 1)
+        node_with_minimum_mean_distance = int(np.argmin(mean_distances))
+        distance_distance = path_lengths[:, node_with_minimum_mean_distance]
         
         return {
-            'degree': distance_degree,
-            'correlation': distance_correlation,
-            'distance': distance_distance
+            'degree': dict(zip(tickers, distance_degree.tolist())),
+            'correlation': dict(zip(tickers, distance_correlation.tolist())),
+            'distance': dict(zip(tickers, distance_distance.tolist()))
         }
         
     def get_portfolio_suggestions(self) -> Dict[str, List[str]]:
         """Get central and peripheral portfolio suggestions using the original algorithm criteria."""
-        # Analyze each year from 2011-2020
-        all_centrality_scores = {}
-        all_distance_scores = {}
-        
-        for year in range(2011, 2021):
-            yearly_data = self.get_year_wise_data(year)
-            log_returns = self.compute_log_returns(yearly_data)
-            correlation_matrix = self.compute_correlation_matrix(log_returns)
-            filtered_network = self.create_filtered_network(correlation_matrix)
-            
-            # Get centrality measures
-            centrality_measures = self.compute_centrality_measures(filtered_network)
-            
-            # For each stock, check if it meets the criteria
-            for stock in filtered_network.nodes():
-                if stock not in all_centrality_scores:
-                    all_centrality_scores[stock] = {'central_years': 0, 'peripheral_years': 0}
-                
-                degree = centrality_measures['degree'][stock]
-                betweenness = centrality_measures['betweenness'][stock]
-                
-                # Central criteria: in top 10% of either degree or betweenness
-                degree_threshold = np.percentile(list(centrality_measures['degree'].values()), 90)
-                betweenness_threshold = np.percentile(list(centrality_measures['betweenness'].values()), 90)
-                
-                if degree >= degree_threshold or betweenness >= betweenness_threshold:
-                    all_centrality_scores[stock]['central_years'] += 1
-                
-                # Peripheral criteria: degree equals 1 or betweenness equals 0
-                if degree == min(centrality_measures['degree'].values()) or betweenness == 0:
-                    all_centrality_scores[stock]['peripheral_years'] += 1
+        # Years run sequentially: each takes ~30ms, far less than a worker process spends importing
+        tickers = list(self.historical_data_cleaned.columns)
+        years = [year for year in range(2011, 2021) if year not in self._year_flags]
+        # Rows lo..hi-2 are the returns between trading days inside each year
+        yearly_log_returns = [self._log_returns[lo:hi - 1] for lo, hi in (self._year_bounds[year] for year in years)]
+        self._year_flags.update(zip(years, map(_analyze_year, yearly_log_returns, itertools.repeat(tickers))))
+        results = [self._year_flags[year] for year in range(2011, 2021)]
+        
+        # Per-stock year counts, one slot per ticker
+        central_years = np.sum([central for central, _ in results], axis=0, dtype=np.int16)
+        peripheral_years = np.sum([peripheral for _, peripheral in results], axis=0, dtype=np.int16)
         
         # Select stocks that meet criteria in majority of years
-        central_portfolio = []
-        peripheral_portfolio = []
         min_years_threshold = 5  # Stock must meet criteria in at least 5 years
-        
-        for stock, scores in all_centrality_scores.items():
-            if scores['central_years'] >= min_years_threshold:
-                central_portfolio.append(stock)
-            if scores['peripheral_years'] >= min_years_threshold:
-                peripheral_portfolio.append(stock)
+        central_portfolio = [tickers[i] for i in np.flatnonzero(central_years >= min_years_threshold)]
+        peripheral_portfolio = [tickers[i] for i in np.flatnonzero(peripheral_years >= min_years_threshold)]
         
         # If we have too few stocks, take the top/bottom 15
         if len(central_portfolio) < 15 or len(peripheral_portfolio) < 15:
-            # Calculate average centrality scores
-            avg_centrality = {}
-            avg_peripherality = {}
-            
-            for stock, scores in all_centrality_scores.items():
-                avg_centrality[stock] = scores['central_years'] / 10  # 10 years total
-                avg_peripherality[stock] = scores['peripheral_years'] / 10
-            
-            # Sort stocks by scores
-            sorted_central = sorted(avg_centrality.items(), key=lambda x: x[1], reverse=True)
-            sorted_peripheral = sorted(avg_peripherality.items(), key=lambda x: x[1], reverse=True)
-            
-            central_portfolio = [stock for stock, _ in sorted_central[:15]]
-            peripheral_portfolio = [stock for stock, _ in sorted_peripheral[:15]]
+            # Stable sort keeps ticker order among ties
+            central_portfolio = [tickers[i] for i in np.argsort(-central_years, kind='stable')[:15]]
+            peripheral_portfolio = [tickers[i] for i in np.argsort(-peripheral_years, kind='stable')[:15]]
         
         return {
             'central_portfolio': central_portfolio,
@@ -168,48 +266,83 @@ class StockAnalyzer:
 
     def calculate_portfolio_returns(self, portfolio: List[str], data: pd.DataFrame) -> pd.Series:
         """Calculate equal-weighted portfolio returns."""
-        if not portfolio or not all(stock in data.columns for stock in portfolio):
+        if not portfolio or len(data.columns.intersection(portfolio)) != len(set(portfolio)):
             return pd.Series(0, index=data.index)
         
-        portfolio_data = data[portfolio]
-        portfolio_returns = portfolio_data.pct_change()
-        return portfolio_returns.mean(axis=1)  # Equal-weighted portfolio
+        prices = data[portfolio].to_numpy()
+        returns = prices[1:] / prices[:-1] - 1.0
+        return pd.Series(returns.mean(axis=1, dtype=np.float64), index=data.index[1:])  # Equal-weighted portfolio
 
     def get_portfolio_performance(self, portfolio: List[str]) -> Dict[str, Dict[str, float]]:
         """Calculate portfolio performance metrics for each year."""
-        if not portfolio:
+        return self.get_portfolios_performance({'portfolio': portfolio}).get('portfolio', {})
+
+    def get_portfolios_performance(self, portfolios: Dict[str, List[str]]) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Calculate yearly and validation performance for several portfolios in one pass."""
+        names = [name for name, portfolio in portfolios.items() if portfolio]
+        if not names:
             return {}
 
-        performance_data = {
-            'yearly': {},
-            'validation': {}  # 2021 data
-        }
+        # Daily equal-weighted returns over 2011-2020 for every portfolio, from one price array
+        columns = self.historical_data_cleaned.columns
+        ticker_union = columns.intersection(list(set().union(*(portfolios[name] for name in names))))
+        position = {ticker: i for i, ticker in enumerate(ticker_union)}
+        prices = self.historical_data_cleaned[ticker_union].to_numpy()
+        returns = prices[1:] / prices[:-1] - 1.0
+        daily_returns = np.zeros((len(returns), len(names)))
+        for j, name in enumerate(names):
+            if all(stock in position for stock in portfolios[name]):
+                daily_returns[:, j] = returns[:, [position[stock] for stock in portfolios[name]]].mean(axis=1, dtype=np.float64)
 
-        # Calculate yearly performance (2011-2020)
-        for year in range(2011, 2021):
-            yearly_data = self.get_year_wise_data(year)
-            yearly_returns = self.calculate_portfolio_returns(portfolio, yearly_data)
-            
-            avg_return = yearly_returns.mean()
-            volatility = yearly_returns.std()
-            sharpe = avg_return / volatility if volatility != 0 else 0
-            
-            performance_data['yearly'][str(year)] = {
-                'average_return': float(avg_return),
-                'volatility': float(volatility),
-                'sharpe_ratio': float(sharpe)
+        # Return rows [lo, hi - 1) are the within-year returns; the row at hi - 1 crosses into
+        # the next year. Zero every row outside a year so one reduceat segment per year start
+        # sums exactly that year's returns. A trailing zero row keeps every start in range.
+        years = list(range(2011, 2021))
+        bounds = [self._year_bounds[year] for year in years]
+        in_year = np.zeros(len(daily_returns), dtype=bool)
+        for lo, hi in bounds:
+            in_year[lo:max(hi - 1, lo)] = True
+        masked_returns = np.zeros((len(daily_returns) + 1, len(names)))
+        masked_returns[:-1][in_year] = daily_returns[in_year]
+        starts = np.minimum([lo for lo, _ in bounds], len(daily_returns))
+        counts = np.array([max(hi - 1 - lo, 0) for lo, hi in bounds])[:, None]
+        sums = np.add.reduceat(masked_returns, starts, axis=0)
+        square_sums = np.add.reduceat(masked_returns ** 2, starts, axis=0)
+
+        # Years with no returns (reduceat yields a stray element for a repeated start) get a NaN
+        # mean, and years with a single return a NaN volatility, as pandas mean()/std() would
+        avg_returns = np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+        variances = np.divide(square_sums - counts * avg_returns ** 2, counts - 1, out=np.full(sums.shape, np.nan), where=counts > 1)
+        volatilities = np.sqrt(np.maximum(variances, 0, where=counts > 1, out=variances))
+        sharpes = np.divide(avg_returns, volatilities, out=np.zeros_like(avg_returns), where=volatilities != 0)
+
+        performance = {}
+        for j, name in enumerate(names):
+            performance_data = {
+                'yearly': {},
+                'validation': {}  # 2021 data
             }
 
-        # Calculate validation performance (2021)
-        validation_returns = self.calculate_portfolio_returns(portfolio, self.validation_data_cleaned)
-        validation_avg_return = validation_returns.mean()
-        validation_volatility = validation_returns.std()
-        validation_sharpe = validation_avg_return / validation_volatility if validation_volatility != 0 else 0
+            # Calculate yearly performance (2011-2020)
+            for i, year in enumerate(years):
+                performance_data['yearly'][str(year)] = {
+                    'average_return': float(avg_returns[i, j]),
+                    'volatility': float(volatilities[i, j]),
+                    'sharpe_ratio': float(sharpes[i, j])
+                }
 
-        performance_data['validation'] = {
-            'average_return': float(validation_avg_return),
-            'volatility': float(validation_volatility),
-            'sharpe_ratio': float(validation_sharpe)
-        }
+            # Calculate validation performance (2021)
+            validation_returns = self.calculate_portfolio_returns(portfolios[name], self.validation_data_cleaned)
+            validation_avg_return = validation_returns.mean()
+            validation_volatility = validation_returns.std()
+            validation_sharpe = validation_avg_return / validation_volatility if validation_volatility != 0 else 0
+
+            performance_data['validation'] = {
+                'average_return': float(validation_avg_return),
+                'volatility': float(validation_volatility),
+                'sharpe_ratio': float(validation_sharpe)
+            }
+
+            performance[name] = performance_data
 
-        return performance_data 
\ No newline at end of file
+        return performance
@@ -1,3 +1,99 @@
 from django.test import TestCase
+from unittest import mock
+import igraph as ig
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from .stock_analysis import StockAnalyzer, _eigenvector_centrality, _tree_betweenness
 
 # Create your tests here.
+
+class TreeBetweennessTests(TestCase):
+    def assert_matches_networkx(self, n, edges):
+        tree = ig.Graph(n=n, edges=edges)
+        reference_graph = nx.Graph()
+        reference_graph.add_nodes_from(range(n))
+        reference_graph.add_edges_from(edges)
+        reference = nx.betweenness_centrality(reference_graph, normalized=False)
+        np.testing.assert_allclose(_tree_betweenness(tree), [reference[v] for v in range(n)])
+
+    def test_path(self):
+        self.assert_matches_networkx(6, [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5)])
+
+    def test_star(self):
+        self.assert_matches_networkx(6, [(0, 1), (0, 2), (0, 3), (0, 4), (0, 5)])
+
+    def test_two_component_forest(self):
+        # A path and a star, with the star's centre not the lowest vertex id
+        self.assert_matches_networkx(9, [(0, 1), (1, 2), (2, 3), (4, 6), (5, 6), (7, 6), (8, 6)])
+
+
+class EigenvectorCentralityTests(TestCase):
+    # Trees are bipartite, so these would oscillate without the A + I shift
+    def assert_matches_networkx(self, n, edges):
+        tree = ig.Graph(n=n, edges=edges)
+        reference_graph = nx.Graph(edges)
+        reference = nx.eigenvector_centrality_numpy(reference_graph)
+        with self.assertNoLogs('api.stock_analysis', level='WARNING'):
+            centrality = _eigenvector_centrality(tree.get_adjacency_sparse())
+        np.testing.assert_allclose(centrality, [reference[v] for v in range(n)], atol=1e-6)
+
+    def test_path(self):
+        self.assert_matches_networkx(6, [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5)])
+
+    def test_star(self):
+        self.assert_matches_networkx(6, [(0, 1), (0, 2), (0, 3), (0, 4), (0, 5)])
+
+
+class CentralityMeasuresTests(TestCase):
+    def test_small_graphs_match_networkx(self):
+        for n, edges in [(1, []), (2, [(0, 1)]), (3, [(0, 1), (1, 2)])]:
+            graph = ig.Graph(n=n, edges=edges, vertex_attrs={'name': [str(v) for v in range(n)]})
+            reference_graph = nx.Graph()
+            reference_graph.add_nodes_from(str(v) for v in range(n))
+            reference_graph.add_edges_from((str(u), str(v)) for u, v in edges)
+            centrality = StockAnalyzer.compute_centrality_measures(graph)
+            self.assertEqual(centrality['degree'], nx.degree_centrality(reference_graph))
+            self.assertEqual(centrality['betweenness'], nx.betweenness_centrality(reference_graph))
+
+
+class PortfolioPerformanceTests(TestCase):
+    def setUp(self):
+        # 2017 has no trading days, 2018 one (no returns) and 2019 two (a single return)
+        dates = pd.DatetimeIndex(['2010-12-31']).append(pd.bdate_range('2011-01-01', '2016-12-31'))
+        dates = dates.append(pd.DatetimeIndex(['2018-06-01', '2019-03-01', '2019-03-04']))
+        dates = dates.append(pd.bdate_range('2020-01-01', '2020-12-31'))
+        rng = np.random.default_rng(0)
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), 4)), axis=0))
+        self.historical = pd.DataFrame(prices, index=dates.strftime('%Y-%m-%d'), columns=['A', 'B', 'C', 'D'])
+        validation = self.historical.iloc[-20:]
+        with mock.patch.object(pd, 'read_csv', side_effect=[self.historical, validation]):
+            self.analyzer = StockAnalyzer()
+
+    def expected_yearly(self, portfolio):
+        """Per-year figures as the original pandas loop computed them."""
+        data = self.analyzer.historical_data_cleaned.astype(np.float64)
+        expected = {}
+        for year in range(2011, 2021):
+            returns = data.loc[str(year):str(year), portfolio].pct_change().mean(axis=1)
+            avg_return, volatility = returns.mean(), returns.std()
+            expected[str(year)] = (avg_return, volatility, avg_return / volatility if volatility != 0 else 0)
+        return expected
+
+    def test_yearly_performance_matches_pandas(self):
+        portfolios = {'first': ['A', 'B'], 'second': ['B', 'C', 'D']}
+        performance = self.analyzer.get_portfolios_performance(portfolios)
+        for name, portfolio in portfolios.items():
+            for year, expected in self.expected_yearly(portfolio).items():
+                yearly = performance[name]['yearly'][year]
+                actual = (yearly['average_return'], yearly['volatility'], yearly['sharpe_ratio'])
+                # Prices are stored as float32, so near-zero means need an absolute tolerance
+                np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-6, err_msg=f'{name} {year}')
+
+    def test_degenerate_years(self):
+        yearly = self.analyzer.get_portfolio_performance(['A'])['yearly']
+        self.assertTrue(np.isnan(yearly['2017']['average_return']))
+        self.assertTrue(np.isnan(yearly['2018']['average_return']))
+        self.assertFalse(np.isnan(yearly['2019']['average_return']))
+        self.assertTrue(np.isnan(yearly['2019']['volatility']))
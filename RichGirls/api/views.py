@@ -2,40 +2,55 @@ from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from typing import Dict, Tuple
+import functools
 import logging
+import os
 import traceback
-from .stock_analysis import StockAnalyzer
+from .stock_analysis import HISTORICAL_FILE, VALIDATION_FILE, StockAnalyzer
 
 logger = logging.getLogger(__name__)
 
+def _data_files_key() -> Tuple[Tuple[float, int], Tuple[float, int]]:
+    """Identify the current data files by modification time and size."""
+    stats = [os.stat(path) for path in (HISTORICAL_FILE, VALIDATION_FILE)]
+    return tuple((st.st_mtime, st.st_size) for st in stats)
+
+# Shared across requests: DRF builds a new view per request, and loading the CSVs is the expensive part.
+# Keyed by the data files so an updated CSV is picked up on the next request.
+@functools.lru_cache(maxsize=1)
+def _get_analyzer(historical_key: Tuple[float, int], validation_key: Tuple[float, int]) -> StockAnalyzer:
+    """Return the process-wide StockAnalyzer for the given data files."""
+    return StockAnalyzer()
+
+@functools.lru_cache(maxsize=4)
+def _run_full_analysis(historical_key: Tuple[float, int], validation_key: Tuple[float, int]) -> Dict:
+    """Run the full analysis; the result is deterministic for given data files."""
+    analyzer = _get_analyzer(historical_key, validation_key)
+    
+    # Get portfolio suggestions
+    portfolios = analyzer.get_portfolio_suggestions()
+    
+    # Get performance metrics for both portfolios in one pass
+    performance = analyzer.get_portfolios_performance({
+        'central': portfolios['central_portfolio'],
+        'peripheral': portfolios['peripheral_portfolio']
+    })
+    
+    return {
+        'portfolios': portfolios,
+        'performance': {
+            'central': performance.get('central', {}),
+            'peripheral': performance.get('peripheral', {})
+        }
+    }
+
 # Create your views here.
 
 class StockAnalysisView(APIView):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        try:
-            self.analyzer = StockAnalyzer()
-        except Exception as e:
-            logger.error(f"Error initializing StockAnalyzer: {str(e)}")
-            logger.error(traceback.format_exc())
-            raise
-
     def get(self, request):
         try:
-            # Get portfolio suggestions
-            portfolios = self.analyzer.get_portfolio_suggestions()
-            
-            # Get performance metrics for each portfolio
-            central_performance = self.analyzer.get_portfolio_performance(portfolios['central_portfolio'])
-            peripheral_performance = self.analyzer.get_portfolio_performance(portfolios['peripheral_portfolio'])
-            
-            return Response({
-                'portfolios': portfolios,
-                'performance': {
-                    'central': central_performance,
-                    'peripheral': peripheral_performance
-                }
-            })
+            return Response(_run_full_analysis(*_data_files_key()))
         except FileNotFoundError as e:
             logger.error(f"Data file not found: {str(e)}")
             return Response(